@@ -5,11 +5,14 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
+import asyncio
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError, OperationFailure
+from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import Dict, List, Set, Tuple, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -17,20 +20,28 @@ load_dotenv()
 
 _client = None
 db = None
+_async_client = None
+async_db = None
 
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
-    db = _client[database_name]
+    _async_client = AsyncIOMotorClient(database_url)
+    async_db = _async_client[database_name]
 
-# Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
-    """Insert a single document with timestamp"""
-    if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+def get_db():
+    """Return the synchronous database, connecting on first use"""
+    # The API only uses async_db; the sync client is opened lazily so each
+    # worker doesn't keep a second connection pool it never uses.
+    global _client, db
+    if db is None and database_url and database_name:
+        _client = MongoClient(database_url)
+        db = _client[database_name]
+    return db
 
+def _prepare_document(data: Union[BaseModel, dict]) -> dict:
+    """Convert to a plain dict and stamp created/updated timestamps"""
     # Convert Pydantic model to dict if needed
     if isinstance(data, BaseModel):
         data_dict = data.model_dump()
@@ -39,12 +50,124 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
 
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
+    return data_dict
 
-    result = db[collection_name].insert_one(data_dict)
+# Helper functions for common database operations
+def create_document(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp"""
+    db = get_db()
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    result = db[collection_name].insert_one(_prepare_document(data))
     return str(result.inserted_id)
 
+# Batched inserts: concurrent callers are coalesced into one unordered
+# insert_many per collection. The first document queued for a collection
+# schedules a flush BATCH_FLUSH_INTERVAL seconds later; the batch is flushed
+# earlier as soon as BATCH_MAX_SIZE documents are waiting.
+BATCH_MAX_SIZE = 500
+BATCH_FLUSH_INTERVAL = 0.005
+
+_pending: Dict[str, List[Tuple[dict, asyncio.Future]]] = {}
+_flush_timers: Dict[str, asyncio.TimerHandle] = {}
+_flush_tasks: Set[asyncio.Task] = set()
+
+def _take_batch(collection_name: str):
+    timer = _flush_timers.pop(collection_name, None)
+    if timer is not None:
+        timer.cancel()
+    return _pending.pop(collection_name, None)
+
+def _schedule_flush(collection_name: str):
+    batch = _take_batch(collection_name)
+    if not batch:
+        return
+    # run in its own task so cancelling any one caller can't abort the write,
+    # and keep a reference so the task isn't garbage collected mid-flight
+    task = asyncio.get_running_loop().create_task(_write_batch(collection_name, batch))
+    _flush_tasks.add(task)
+    task.add_done_callback(_flush_tasks.discard)
+
+def _fail_batch(batch: List[Tuple[dict, asyncio.Future]], error: Exception):
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+async def _write_batch(collection_name: str, batch: List[Tuple[dict, asyncio.Future]]):
+    docs = [doc for doc, _ in batch]
+    failed = {}
+    try:
+        # insert_many assigns _id on each document in place
+        await async_db[collection_name].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed = {err["index"]: err.get("errmsg", "Write error") for err in e.details.get("writeErrors", [])}
+    except Exception as e:
+        _fail_batch(batch, e)
+        return
+    except BaseException:
+        # cancelled or shutting down: never leave callers waiting forever
+        _fail_batch(batch, Exception("Batched insert was interrupted"))
+        raise
+
+    for index, (doc, future) in enumerate(batch):
+        if future.done():
+            continue
+        if index in failed:
+            future.set_exception(Exception(failed[index]))
+        else:
+            future.set_result(str(doc["_id"]))
+
+async def flush_pending_documents():
+    """Flush every queued document immediately"""
+    for collection_name in list(_pending):
+        batch = _take_batch(collection_name)
+        if batch:
+            await _write_batch(collection_name, batch)
+    # let writes already handed off to their own tasks finish too
+    if _flush_tasks:
+        await asyncio.gather(*_flush_tasks, return_exceptions=True)
+
+async def create_document_batched(collection_name: str, data: Union[BaseModel, dict]):
+    """Queue a document with timestamp for the next batched insert and return its id"""
+    if async_db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    batch = _pending.get(collection_name)
+    if batch is None:
+        batch = _pending[collection_name] = []
+        _flush_timers[collection_name] = loop.call_later(BATCH_FLUSH_INTERVAL, _schedule_flush, collection_name)
+    batch.append((_prepare_document(data), future))
+    if len(batch) >= BATCH_MAX_SIZE:
+        _schedule_flush(collection_name)
+    return await future
+
+# MongoDB "IndexNotFound" error code
+INDEX_NOT_FOUND = 27
+
+async def audit_indexes(collection_name: str, required: Tuple[str, ...] = ("_id_",), drop: bool = False):
+    """Return index names on a collection beyond the required ones, optionally dropping them"""
+    if async_db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    collection = async_db[collection_name]
+    info = await collection.index_information()
+    extra = [name for name in info if name not in required]
+    if drop:
+        for name in extra:
+            try:
+                await collection.drop_index(name)
+            except OperationFailure as e:
+                # another worker dropped it first
+                if e.code != INDEX_NOT_FOUND:
+                    raise
+    return extra
+
 def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
     """Get documents from collection"""
+    db = get_db()
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
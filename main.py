@@ -1,87 +1,267 @@
 import os
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+import hashlib
+from functools import lru_cache
+import orjson
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from database import db, create_document, get_documents
+from starlette.datastructures import Headers, MutableHeaders
+from types import MappingProxyType
+from typing import Final, List, Optional, Dict, Any, Mapping, Sequence
+from database import async_db, audit_indexes, create_document_batched, flush_pending_documents
 from schemas import Configuration, Customer
 
-app = FastAPI(title="Commercial Vehicle Offer Configurator API")
+# Environment does not change after startup (database.py has already loaded .env)
+_ENV_STATUS = {
+    "database_url": "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set",
+    "database_name": "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set",
+}
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+logger = logging.getLogger(__name__)
+
+# The API only ever inserts into "configuration", so any index besides _id
+# just adds write cost. Set DROP_UNUSED_INDEXES=1 to remove them at startup.
+OFFER_COLLECTION = "configuration"
+DROP_UNUSED_INDEXES = os.getenv("DROP_UNUSED_INDEXES") == "1"
+
+# /test is polled by health checks; avoid a Mongo round trip on every hit
+COLLECTIONS_CACHE_TTL = 5.0
+_collections_cache = (0.0, [])
+
+async def _audit_offer_indexes():
+    try:
+        extra = await audit_indexes(OFFER_COLLECTION, drop=DROP_UNUSED_INDEXES)
+        if extra:
+            action = "Dropped" if DROP_UNUSED_INDEXES else "Unused"
+            logger.warning("%s indexes on %s: %s", action, OFFER_COLLECTION, ", ".join(extra))
+    except Exception as e:
+        logger.warning("Index audit on %s failed: %s", OFFER_COLLECTION, e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Audit in the background: startup must not wait on Mongo server selection,
+    # since the catalog endpoints and /test don't need the database.
+    audit = asyncio.create_task(_audit_offer_indexes()) if async_db is not None else None
+    try:
+        yield
+    finally:
+        if audit is not None and not audit.done():
+            audit.cancel()
+        # don't drop offers that were queued right before shutdown
+        await flush_pending_documents()
+
+app = FastAPI(
+    title="Commercial Vehicle Offer Configurator API",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# ----- CORS -----
+# The API allows any origin, method and header with credentials, so the CORS
+# answer is constant apart from echoing the request's Origin and requested
+# headers. A plain ASGI middleware with prebuilt headers replaces CORSMiddleware
+# and keeps its policy: simple responses only echo the Origin when the request
+# carries cookies, otherwise they allow "*".
+_PREFLIGHT_HEADERS = {
+    "Access-Control-Allow-Methods": "DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT",
+    "Access-Control-Allow-Credentials": "true",
+    "Access-Control-Max-Age": "600",
+    "Vary": "Origin",
+}
+_CORS_HEADERS = {
+    "Access-Control-Allow-Credentials": "true",
+}
+
+class OpenCORSMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        origin = headers.get("origin")
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and "access-control-request-method" in headers:
+            preflight = {**_PREFLIGHT_HEADERS, "Access-Control-Allow-Origin": origin}
+            requested_headers = headers.get("access-control-request-headers")
+            if requested_headers:
+                preflight["Access-Control-Allow-Headers"] = requested_headers
+            await Response(status_code=204, headers=preflight)(scope, receive, send)
+            return
+
+        has_cookie = "cookie" in headers
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                response_headers = MutableHeaders(scope=message)
+                response_headers.update(_CORS_HEADERS)
+                if has_cookie:
+                    response_headers["Access-Control-Allow-Origin"] = origin
+                    response_headers.add_vary_header("Origin")
+                else:
+                    response_headers["Access-Control-Allow-Origin"] = "*"
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+app.add_middleware(OpenCORSMiddleware)
+
+# Compress larger JSON bodies; small payloads aren't worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+
 # ----- Catalog mock (could be moved to DB later) -----
 # For now we serve static catalog data from backend for vehicles, colors, upholstery, options.
-# These are read-only lists and do not require persistence.
-VEHICLES = [
-    {"id": "van-s", "name": "City Van S", "base_price": 18990},
-    {"id": "van-m", "name": "Transit M", "base_price": 23990},
-    {"id": "truck-l", "name": "Cargo Truck L", "base_price": 44990},
-]
-
-COLORS = [
-    {"code": "WHI", "name": "Arctic White", "price": 0},
-    {"code": "BLK", "name": "Midnight Black", "price": 450},
-    {"code": "SLV", "name": "Glacier Silver", "price": 450},
-    {"code": "RED", "name": "Signal Red", "price": 690},
-]
-
-UPHOLSTERIES = [
-    {"code": "FAB-G", "name": "Fabric Grey", "price": 0},
-    {"code": "FAB-B", "name": "Fabric Black", "price": 120},
-    {"code": "LEA-B", "name": "Leather Black", "price": 890},
-]
-
-FACTORY_OPTIONS = [
-    {"code": "PKG-COMF", "name": "Comfort Package", "price": 990},
-    {"code": "NAV-PRO", "name": "Navigation Pro", "price": 1290},
-    {"code": "ACC-ADAPT", "name": "Adaptive Cruise Control", "price": 790},
-    {"code": "CAM-360", "name": "360° Camera", "price": 650},
-]
-
-ACCESSORIES = [
-    {"code": "MAT-RUB", "name": "Rubber Floor Mats", "price": 99},
-    {"code": "RACK-ROOF", "name": "Roof Rack", "price": 299},
-    {"code": "BOX-TOOL", "name": "Tool Storage Box", "price": 179},
-]
+# These are read-only tuples and do not require persistence.
+# All prices are integer cents; formatting for display is left to the client.
+
+def _freeze(*entries: Dict[str, Any]):
+    return tuple(MappingProxyType(entry) for entry in entries)
+
+VEHICLES: Final = _freeze(
+    {"id": "van-s", "name": "City Van S", "base_price_cents": 1899000},
+    {"id": "van-m", "name": "Transit M", "base_price_cents": 2399000},
+    {"id": "truck-l", "name": "Cargo Truck L", "base_price_cents": 4499000},
+)
+
+COLORS: Final = _freeze(
+    {"code": "WHI", "name": "Arctic White", "price_cents": 0},
+    {"code": "BLK", "name": "Midnight Black", "price_cents": 45000},
+    {"code": "SLV", "name": "Glacier Silver", "price_cents": 45000},
+    {"code": "RED", "name": "Signal Red", "price_cents": 69000},
+)
+
+UPHOLSTERIES: Final = _freeze(
+    {"code": "FAB-G", "name": "Fabric Grey", "price_cents": 0},
+    {"code": "FAB-B", "name": "Fabric Black", "price_cents": 12000},
+    {"code": "LEA-B", "name": "Leather Black", "price_cents": 89000},
+)
+
+FACTORY_OPTIONS: Final = _freeze(
+    {"code": "PKG-COMF", "name": "Comfort Package", "price_cents": 99000},
+    {"code": "NAV-PRO", "name": "Navigation Pro", "price_cents": 129000},
+    {"code": "ACC-ADAPT", "name": "Adaptive Cruise Control", "price_cents": 79000},
+    {"code": "CAM-360", "name": "360° Camera", "price_cents": 65000},
+)
+
+ACCESSORIES: Final = _freeze(
+    {"code": "MAT-RUB", "name": "Rubber Floor Mats", "price_cents": 9900},
+    {"code": "RACK-ROOF", "name": "Roof Rack", "price_cents": 29900},
+    {"code": "BOX-TOOL", "name": "Tool Storage Box", "price_cents": 17900},
+)
+
+# Lookup tables keyed by id/code, built once at import so pricing and
+# validation are dict gets instead of list scans. Entries and tables are all
+# read-only views so nothing can mutate the catalog behind the _price cache,
+# the price tables or the pre-serialized JSON.
+VEHICLE_BY_ID: Final = MappingProxyType({v["id"]: v for v in VEHICLES})
+COLOR_BY_CODE: Final = MappingProxyType({c["code"]: c for c in COLORS})
+UPHOLSTERY_BY_CODE: Final = MappingProxyType({u["code"]: u for u in UPHOLSTERIES})
+OPTION_BY_CODE: Final = MappingProxyType({o["code"]: o for o in FACTORY_OPTIONS})
+ACCESSORY_BY_CODE: Final = MappingProxyType({a["code"]: a for a in ACCESSORIES})
+
+VEHICLE_IDS: Final = frozenset(VEHICLE_BY_ID)
+COLOR_CODES: Final = frozenset(COLOR_BY_CODE)
+UPHOLSTERY_CODES: Final = frozenset(UPHOLSTERY_BY_CODE)
+OPTION_CODES: Final = frozenset(OPTION_BY_CODE)
+ACCESSORY_CODES: Final = frozenset(ACCESSORY_BY_CODE)
+
+# Flat code -> price tables for the pricing hot path
+VEHICLE_PRICES: Final = MappingProxyType({vid: v["base_price_cents"] for vid, v in VEHICLE_BY_ID.items()})
+COLOR_PRICES: Final = MappingProxyType({code: c["price_cents"] for code, c in COLOR_BY_CODE.items()})
+UPHOLSTERY_PRICES: Final = MappingProxyType({code: u["price_cents"] for code, u in UPHOLSTERY_BY_CODE.items()})
+OPTION_PRICES: Final = MappingProxyType({code: o["price_cents"] for code, o in OPTION_BY_CODE.items()})
+ACCESSORY_PRICES: Final = MappingProxyType({code: a["price_cents"] for code, a in ACCESSORY_BY_CODE.items()})
+
+# Catalog lists never change at runtime, so serialize them to JSON once and
+# serve the same bytes on every request.
+CATALOG_CACHE_CONTROL = "public, max-age=3600"
+
+
+def _serialize_catalog(items: Sequence[Mapping[str, Any]]):
+    # orjson can't encode mappingproxy, so serialize plain copies
+    body = orjson.dumps([dict(item) for item in items])
+    headers = {
+        "Cache-Control": CATALOG_CACHE_CONTROL,
+        "ETag": f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"',
+    }
+    return body, headers
+
+
+def _catalog_response(request: Request, body: bytes, headers: Dict[str, str]) -> Response:
+    # If-None-Match uses weak comparison, so ignore any W/ prefix on either side
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etag = headers["ETag"][2:]
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+VEHICLES_JSON, VEHICLES_HEADERS = _serialize_catalog(VEHICLES)
+COLORS_JSON, COLORS_HEADERS = _serialize_catalog(COLORS)
+UPHOLSTERIES_JSON, UPHOLSTERIES_HEADERS = _serialize_catalog(UPHOLSTERIES)
+FACTORY_OPTIONS_JSON, FACTORY_OPTIONS_HEADERS = _serialize_catalog(FACTORY_OPTIONS)
+ACCESSORIES_JSON, ACCESSORIES_HEADERS = _serialize_catalog(ACCESSORIES)
 
 # Utility to calculate price
 
-def calculate_total(cfg: Configuration) -> float:
-    base_price = next((v["base_price"] for v in VEHICLES if v["id"] == cfg.vehicle_id), 0)
-    color_price = next((c["price"] for c in COLORS if c["code"] == cfg.color_code), 0)
-    up_price = next((u["price"] for u in UPHOLSTERIES if u["code"] == cfg.upholstery_code), 0)
-    opt_sum = sum(o["price"] for o in FACTORY_OPTIONS if o["code"] in cfg.factory_options)
-    acc_sum = sum(a["price"] for a in ACCESSORIES if a["code"] in cfg.accessories)
-    return float(base_price + color_price + up_price + opt_sum + acc_sum)
+@lru_cache(maxsize=4096)
+def _price(vehicle_id: str, color_code: str, upholstery_code: str, factory_options: tuple, accessories: tuple) -> int:
+    # Pure function of the static catalog; call _price.cache_clear() if the catalog ever changes.
+    # Codes are validated by create_offer before pricing, so plain lookups suffice.
+    return (
+        VEHICLE_PRICES[vehicle_id]
+        + COLOR_PRICES[color_code]
+        + UPHOLSTERY_PRICES[upholstery_code]
+        + sum(map(OPTION_PRICES.__getitem__, factory_options))
+        + sum(map(ACCESSORY_PRICES.__getitem__, accessories))
+    )
+
+def calculate_total(cfg: Configuration) -> int:
+    # Deduplicate and sort so equivalent selections share one cache slot;
+    # each option is charged once however often it was selected
+    return _price(
+        cfg.vehicle_id,
+        cfg.color_code,
+        cfg.upholstery_code,
+        tuple(sorted(set(cfg.factory_options))),
+        tuple(sorted(set(cfg.accessories))),
+    )
 
 # ----- Read-only catalog endpoints -----
 
 @app.get("/api/catalog/vehicles")
-def get_vehicles():
-    return VEHICLES
+async def get_vehicles(request: Request):
+    return _catalog_response(request, VEHICLES_JSON, VEHICLES_HEADERS)
 
 @app.get("/api/catalog/colors")
-def get_colors():
-    return COLORS
+async def get_colors(request: Request):
+    return _catalog_response(request, COLORS_JSON, COLORS_HEADERS)
 
 @app.get("/api/catalog/upholsteries")
-def get_upholsteries():
-    return UPHOLSTERIES
+async def get_upholsteries(request: Request):
+    return _catalog_response(request, UPHOLSTERIES_JSON, UPHOLSTERIES_HEADERS)
 
 @app.get("/api/catalog/factory-options")
-def get_factory_options():
-    return FACTORY_OPTIONS
+async def get_factory_options(request: Request):
+    return _catalog_response(request, FACTORY_OPTIONS_JSON, FACTORY_OPTIONS_HEADERS)
 
 @app.get("/api/catalog/accessories")
-def get_accessories():
-    return ACCESSORIES
+async def get_accessories(request: Request):
+    return _catalog_response(request, ACCESSORIES_JSON, ACCESSORIES_HEADERS)
 
 # ----- Offer submission -----
 
@@ -90,36 +270,56 @@ class OfferRequest(BaseModel):
 
 class OfferResponse(BaseModel):
     offer_id: str
-    total_price: float
+    total_price_cents: int
 
 @app.post("/api/offers", response_model=OfferResponse)
-def create_offer(payload: OfferRequest):
+async def create_offer(payload: OfferRequest):
     cfg = payload.configuration
-    # derive names for vehicle/color/upholstery for convenience if missing
-    vehicle = next((v for v in VEHICLES if v["id"] == cfg.vehicle_id), None)
-    color = next((c for c in COLORS if c["code"] == cfg.color_code), None)
-    upholstery = next((u for u in UPHOLSTERIES if u["code"] == cfg.upholstery_code), None)
-    if not vehicle or not color or not upholstery:
+    # validate every selection up front, before touching the pricing path
+    if (
+        cfg.vehicle_id not in VEHICLE_IDS
+        or cfg.color_code not in COLOR_CODES
+        or cfg.upholstery_code not in UPHOLSTERY_CODES
+    ):
         raise HTTPException(status_code=400, detail="Invalid catalog selection")
+    if not OPTION_CODES.issuperset(cfg.factory_options):
+        raise HTTPException(status_code=400, detail="Invalid factory option selection")
+    if not ACCESSORY_CODES.issuperset(cfg.accessories):
+        raise HTTPException(status_code=400, detail="Invalid accessory selection")
 
-    cfg.vehicle_name = vehicle["name"]
-    cfg.color_name = color["name"]
-    cfg.upholstery_name = upholstery["name"]
+    # derive names for vehicle/color/upholstery for convenience if missing
+    vehicle = VEHICLE_BY_ID[cfg.vehicle_id]
+    color = COLOR_BY_CODE[cfg.color_code]
+    upholstery = UPHOLSTERY_BY_CODE[cfg.upholstery_code]
 
     total = calculate_total(cfg)
-    cfg.total_price = total
 
-    # Persist configuration document
-    data = cfg.model_dump()
+    # Persist configuration document. Built explicitly in Configuration's
+    # field order so every stored document has the same key layout, which
+    # keeps WiredTiger's block compression effective.
+    data = dict(
+        vehicle_id=cfg.vehicle_id,
+        vehicle_name=vehicle["name"],
+        color_code=cfg.color_code,
+        color_name=color["name"],
+        upholstery_code=cfg.upholstery_code,
+        upholstery_name=upholstery["name"],
+        factory_options=list(cfg.factory_options),
+        accessories=list(cfg.accessories),
+        special_agreement=cfg.special_agreement,
+        customer=cfg.customer.model_dump(),
+        total_price_cents=total,
+    )
     try:
-        offer_id = create_document("configuration", data)
+        offer_id = await create_document_batched(OFFER_COLLECTION, data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-    return OfferResponse(offer_id=offer_id, total_price=total)
+    return OfferResponse(offer_id=offer_id, total_price_cents=total)
 
 @app.get("/test")
-def test_database():
+async def test_database():
+    global _collections_cache
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -130,13 +330,17 @@ def test_database():
     }
 
     try:
-        if db is not None:
+        if async_db is not None:
             response["database"] = "✅ Available"
             response["database_url"] = "✅ Configured"
-            response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
+            response["database_name"] = async_db.name if hasattr(async_db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                fetched_at, collections = _collections_cache
+                now = time.monotonic()
+                if now - fetched_at > COLLECTIONS_CACHE_TTL:
+                    collections = await async_db.list_collection_names()
+                    _collections_cache = (now, collections)
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -146,16 +350,25 @@ def test_database():
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:50]}"
 
-    import os
-    response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
+    response.update(_ENV_STATUS)
     return response
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Configurator API ready"}
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    reload = os.getenv("RELOAD") == "1"
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        reload=reload,
+        # reload mode only supports a single worker process
+        workers=1 if reload else (os.cpu_count() or 1),
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+    )
@@ -11,8 +11,17 @@ Model name is converted to lowercase for the collection name:
 - BlogPost -> "blogs" collection
 """
 
-from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, StringConstraints
+from typing import Annotated, Optional, List
+
+# Length-bounded string types, checked by pydantic-core's compiled validators
+ShortText = Annotated[str, StringConstraints(max_length=256)]
+LongText = Annotated[str, StringConstraints(max_length=2000)]
+
+# Shape-only email check run by pydantic-core's regex engine. It accepts some
+# addresses email-validator would reject; use StrictCustomer where that matters.
+EMAIL_RE = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+EmailText = Annotated[str, StringConstraints(pattern=EMAIL_RE, max_length=254)]
 
 # Example schemas (kept for reference):
 
@@ -45,21 +54,36 @@ class Customer(BaseModel):
     Customer data for an offer request
     Collection name: "customer"
     """
-    first_name: str
-    last_name: str
-    company: Optional[str] = None
+    model_config = ConfigDict(extra="forbid", validate_default=False)
+
+    first_name: ShortText
+    last_name: ShortText
+    company: Optional[ShortText] = None
+    email: EmailText
+    phone: Optional[ShortText] = None
+    street: Optional[ShortText] = None
+    postal_code: Optional[ShortText] = None
+    city: Optional[ShortText] = None
+    notes: Optional[LongText] = None
+
+class StrictCustomer(Customer):
+    """
+    Customer with full email-validator checks, for admin flows
+    Collection name: "customer"
+    """
     email: EmailStr
-    phone: Optional[str] = None
-    street: Optional[str] = None
-    postal_code: Optional[str] = None
-    city: Optional[str] = None
-    notes: Optional[str] = None
 
 class Configuration(BaseModel):
     """
     Vehicle configuration submitted by the user
     Collection name: "configuration"
+
+    Fields are declared from most repeated across documents (catalog
+    selections) to most unique (customer, total); create_offer stores them
+    in this order.
     """
+    model_config = ConfigDict(extra="forbid", validate_assignment=False, validate_default=False)
+
     vehicle_id: str = Field(..., description="Selected vehicle ID")
     vehicle_name: str = Field(..., description="Selected vehicle name for convenience")
     color_code: str = Field(..., description="Color code")
@@ -68,6 +92,6 @@ class Configuration(BaseModel):
     upholstery_name: str = Field(..., description="Upholstery name")
     factory_options: List[str] = Field(default_factory=list, description="List of selected factory option codes")
     accessories: List[str] = Field(default_factory=list, description="List of selected accessory codes")
-    special_agreement: Optional[str] = Field(None, description="Special agreement notes")
+    special_agreement: Optional[LongText] = Field(None, description="Special agreement notes")
     customer: Customer
-    total_price: Optional[float] = Field(None, ge=0)
+    total_price_cents: Optional[int] = Field(None, ge=0, description="Total price in cents")
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+import database
+
+
+class FakeCollection:
+    def __init__(self, fail_indexes=(), delay=0):
+        self.fail_indexes = set(fail_indexes)
+        self.delay = delay
+        self.calls = []
+        self._next_id = 0
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls.append((len(docs), ordered))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        for doc in docs:
+            doc["_id"] = self._next_id
+            self._next_id += 1
+        if self.fail_indexes:
+            raise BulkWriteError({
+                "writeErrors": [{"index": i, "errmsg": f"duplicate {i}"} for i in sorted(self.fail_indexes)],
+            })
+
+
+@pytest.fixture
+def offers(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(database, "async_db", {"offers": collection})
+    return collection
+
+
+def test_single_document_is_flushed_without_background_task(offers):
+    async def run():
+        return await asyncio.wait_for(database.create_document_batched("offers", {"a": 1}), timeout=1)
+
+    assert asyncio.run(run()) == "0"
+    assert offers.calls == [(1, False)]
+
+
+def test_concurrent_documents_are_coalesced(offers):
+    async def run():
+        return await asyncio.gather(*(database.create_document_batched("offers", {"a": i}) for i in range(5)))
+
+    assert asyncio.run(run()) == ["0", "1", "2", "3", "4"]
+    assert offers.calls == [(5, False)]
+
+
+def test_bulk_write_error_only_fails_affected_callers(monkeypatch):
+    collection = FakeCollection(fail_indexes=[1, 3])
+    monkeypatch.setattr(database, "async_db", {"offers": collection})
+
+    async def run():
+        return await asyncio.gather(
+            *(database.create_document_batched("offers", {"a": i}) for i in range(4)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert results[0] == "0"
+    assert results[2] == "2"
+    assert str(results[1]) == "duplicate 1"
+    assert str(results[3]) == "duplicate 3"
+    assert collection.calls == [(4, False)]
+
+
+def test_cancelling_size_triggered_caller_does_not_strand_batch(monkeypatch):
+    collection = FakeCollection(delay=0.01)
+    monkeypatch.setattr(database, "async_db", {"offers": collection})
+    monkeypatch.setattr(database, "BATCH_MAX_SIZE", 3)
+
+    async def run():
+        first = asyncio.ensure_future(database.create_document_batched("offers", {"a": 0}))
+        second = asyncio.ensure_future(database.create_document_batched("offers", {"a": 1}))
+        flushing = asyncio.ensure_future(database.create_document_batched("offers", {"a": 2}))
+        await asyncio.sleep(0)
+        flushing.cancel()
+        return await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+
+    assert asyncio.run(run()) == ["0", "1"]
+    assert collection.calls == [(3, False)]